@@ -4,22 +4,56 @@
 
 Оптимизации JSON → MD:
 - Потоковое чтение (ijson): файл не загружается целиком в память.
-- Один проход конвертации: каждый объект конвертируется в MD один раз, при записи — только join.
+- C-бэкенд ijson (yajl2_c), если доступен: парсинг в разы быстрее чистого Python.
+- Один проход конвертации: каждый объект конвертируется в MD один раз и сразу дописывается в буфер части (bytearray), при записи буфер уходит в файл как есть.
 - Разбиение по лимитам: части пишутся по мере накопления.
+- JSON-вывод через orjson (если установлен): каждый объект сериализуется один раз, в байты.
 """
 
 from __future__ import annotations
 
 import argparse
-import ijson
+import gzip
 import json
 import os
-import re
+import queue
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+
+# Самый быстрый доступный бэкенд ijson: C-расширение (yajl2_c), затем cffi/ctypes-обёртки над
+# системной libyajl и в крайнем случае чистый Python. API (items/parse) у всех одинаковый.
+try:
+    import ijson.backends.yajl2_c as ijson
+except ImportError:
+    try:
+        import ijson.backends.yajl2_cffi as ijson
+    except ImportError:
+        try:
+            import ijson.backends.yajl2 as ijson
+        except ImportError:
+            import ijson.backends.python as ijson
+from ijson.common import ObjectBuilder
+
+# orjson сериализует в разы быстрее стандартного json; без него — тот же компактный вывод через json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# zstd-сжатие частей (--compress zstd) — только если установлен zstandard
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Путь к config.json рядом со скриптом (работает при любом текущем каталоге)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(SCRIPT_DIR, "config.json")
+# Буфер ввода/вывода для входного JSON и выходных частей: меньше системных вызовов read/write
+IO_BUFFER_SIZE = 1 << 20  # 1 МиБ
+
 DEFAULT_CONFIG = {
     "max_file_size_mb": 150.0,
     "max_objects_per_file": 400_000,
@@ -53,29 +87,91 @@ def save_config(cfg: dict) -> None:
         json.dump(cfg, f, ensure_ascii=False, indent=2)
 
 
+# Сжатие выходных частей: расширение, добавляемое к .md/.json
+COMPRESS_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_output(path: str, compress: str = "none"):
+    """Открывает выходной файл на запись в байтах; при compress — сразу в сжатый поток."""
+    if compress == "gzip":
+        # Уровень 1: сжатие почти бесплатно по CPU, а текст чата всё равно ужимается в разы
+        return gzip.open(path, "wb", compresslevel=1)
+    if compress == "zstd":
+        raw = open(path, "wb", buffering=IO_BUFFER_SIZE)
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+    return open(path, "wb", buffering=IO_BUFFER_SIZE)
+
+
+def _json_default(obj):
+    """ijson отдаёт дробные числа как Decimal — сериализуем их как float."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_bytes(obj) -> bytes:
+    """Компактный JSON одного объекта в UTF-8 (без экранирования не-ASCII)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_json_default)
+        except TypeError:
+            # orjson не умеет целые больше 64 бит (JSONEncodeError — подкласс TypeError);
+            # такой объект сериализуем стандартным json, как раньше
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def _list_text(items: list) -> str:
+    """Текст из массива вида ["обычный текст", {"type": "bold", "text": "..."}, ...]."""
+    parts = []
+    for item in items:
+        t = type(item)
+        if t is str:
+            parts.append(item)
+        elif t is dict:
+            text = item.get("text", "")
+            parts.append(text if type(text) is str else str(text))
+    return "".join(parts)
+
+
+# Разбор по точному типу: ijson отдаёт только встроенные str/dict/list/None, поэтому
+# один поиск в словаре заменяет цепочку isinstance (она вызывается на каждый text_entity).
+_EXTRACT_BY_TYPE = {
+    str: lambda obj: obj,
+    dict: lambda obj: str(obj.get("text", "")),
+    list: _list_text,
+    type(None): lambda obj: "",
+}
+
+
 def _extract_text(obj) -> str:
     """
     Извлекает обычный текст из поля text (строка, объект или массив с type/text).
     Используется для экспорта Telegram.
     """
-    if obj is None:
-        return ""
-    if isinstance(obj, str):
-        return obj
-    if isinstance(obj, dict):
-        return str(obj.get("text", ""))
-    if isinstance(obj, list):
-        parts = []
-        for item in obj:
-            if isinstance(item, str):
-                parts.append(item)
-            elif isinstance(item, dict):
-                parts.append(item.get("text", ""))
-        return "".join(str(p) for p in parts)
-    return str(obj)
+    fn = _EXTRACT_BY_TYPE.get(type(obj))
+    return fn(obj) if fn is not None else str(obj)
 
 
-_WS_RE = re.compile(r"\s+")
+def _extract_text_entities(entities: list) -> str:
+    """Текст из массива text_entities (экспорт Telegram): куски через пробел."""
+    return " ".join([_extract_text(e) for e in entities])
+
+
+def _message_text(obj: dict) -> str:
+    """
+    Текст сообщения: поле text, а если оно пустое — text_entities.
+    Обычный случай (text — непустая строка) обходится без вызова _extract_text.
+    """
+    text = obj.get("text")
+    if type(text) is str:
+        if not text and (entities := obj.get("text_entities")):
+            return _extract_text_entities(entities)
+        return text
+    if not text:
+        entities = obj.get("text_entities")
+        return _extract_text_entities(entities) if entities else ""
+    return _extract_text(text)
 
 
 def _normalize_text(s: str) -> str:
@@ -83,34 +179,169 @@ def _normalize_text(s: str) -> str:
     Нормализует текст для NotebookLM:
     - убирает переносы строк и любые повторяющиеся пробельные символы
     - удаляет пустые строки (как частный случай)
+
+    str.split() без аргументов режет по тем же пробельным символам, что и \\s в re,
+    но весь проход идёт в C, без регулярного выражения.
     """
     if not s:
         return ""
-    return _WS_RE.sub(" ", s).strip()
+    return " ".join(s.split())
 
 
-def obj_to_md(obj: dict) -> str:
+def _fmt_date(date):
     """
-    Конвертирует один объект (сообщение Telegram и т.п.) в компактный блок Markdown:
-    - без пустых строк
-    - без переносов внутри текста (в одну строку)
+    ISO-дату "2023-12-27T10:28:15" сокращает до "2023-12-27 10:28" (YYYY-MM-DD HH:MM).
+    Обычный случай (строка из экспорта Telegram) — одним срезом, без str() и replace().
     """
-    date = obj.get("date", "")
-    if date and "T" in str(date):
-        date = str(date).replace("T", " ")[:16]
+    if type(date) is str:
+        if len(date) >= 11 and date[10] == "T":
+            return date[:10] + " " + date[11:16]
+        return date.replace("T", " ")[:16] if "T" in date else date
+    if date:
+        d = str(date)
+        if "T" in d:
+            return d.replace("T", " ")[:16]
+    return date
+
+
+def _md_fields(obj: dict) -> tuple[str, str, str]:
+    """
+    Дата, автор и текст для компактного блока Markdown одного объекта (сообщение Telegram и т.п.):
+    - текст в одну строку, без пустых строк и переносов
+    - ведущий # экранирован, чтобы текст не стал заголовком
+    """
+    date = _fmt_date(obj.get("date", ""))
     author = obj.get("from") or obj.get("actor") or ""
-    text = obj.get("text") or ""
-    if not text and obj.get("text_entities"):
-        text = " ".join(_extract_text(e) for e in obj["text_entities"])
-    else:
-        text = _extract_text(text)
-    text = _normalize_text(text)
-    lines = [f"### {date} | {author}"]
-    if text:
-        if text.startswith("#"):
-            text = "\\" + text
-        lines.append(text)
-    return "\n".join(lines)
+    text = _normalize_text(_message_text(obj))
+    if text and text[0] == "#":
+        text = "\\" + text
+    return date, author, text
+
+
+# Поля сообщения, которые реально нужны для MD и TXT (chat); остальное (медиа, реакции, ответы) не строим.
+_MESSAGE_FIELDS = frozenset({"date", "from", "actor", "text", "text_entities"})
+_OPEN_EVENTS = frozenset({"start_map", "start_array"})
+_CLOSE_EVENTS = frozenset({"end_map", "end_array"})
+
+
+def _iter_filtered_events(fin, prefix: str, keep: frozenset):
+    """Обходит события ijson.parse и собирает из каждого элемента массива только ключи из keep."""
+    events = ijson.parse(fin)
+    for path, event, _ in events:
+        if event != "start_map" or path != prefix:
+            continue
+        obj = {}
+        # На уровне элемента идут только map_key ... и завершающий end_map
+        for _, event, key in events:
+            if event == "end_map":
+                break
+            _, event, value = next(events)
+            if event not in _OPEN_EVENTS:
+                if key in keep:
+                    obj[key] = value
+                continue
+            # Вложенный объект/массив: собираем, если поле нужно, иначе просто пропускаем события
+            builder = ObjectBuilder() if key in keep else None
+            if builder is not None:
+                builder.event(event, value)
+            depth = 1
+            for _, event, value in events:
+                if builder is not None:
+                    builder.event(event, value)
+                if event in _OPEN_EVENTS:
+                    depth += 1
+                elif event in _CLOSE_EVENTS:
+                    depth -= 1
+                    if not depth:
+                        break
+            if builder is not None:
+                obj[key] = builder.value
+        yield obj
+
+
+def iter_filtered_items(fin, prefix: str, keep: frozenset = _MESSAGE_FIELDS):
+    """
+    Потоково отдаёт элементы массива по prefix, оставляя в каждом только ключи из keep.
+
+    С C-бэкендом (yajl2_c) объекты и так собираются в C, и цикл по событиям в Python
+    оказался бы медленнее, поэтому там используется ijson.items, а лишние поля просто игнорируются.
+    """
+    if ijson.backend == "yajl2_c":
+        return ijson.items(fin, prefix)
+    return _iter_filtered_events(fin, prefix, keep)
+
+
+# Конвейер «разбор → запись»: объекты передаются потоку записи пачками, очередь ограничена,
+# чтобы при медленном диске не копить в памяти весь файл.
+_PIPELINE_BATCH = 1024
+_PIPELINE_DEPTH = 8
+
+
+def _pipeline(items, encode_fn, write_fn) -> None:
+    """
+    Разбирает и кодирует объекты в текущем потоке, а записывает в отдельном.
+
+    encode_fn(item) вызывается для каждого объекта (None — пропустить), write_fn(encoded) —
+    в потоке записи в том же порядке. Пока поток записи ждёт диск (GIL при этом отпущен),
+    текущий поток продолжает разбирать JSON. Ошибка записи пробрасывается вызывающему.
+    """
+    q: queue.Queue = queue.Queue(maxsize=_PIPELINE_DEPTH)
+    errors: list[BaseException] = []
+
+    def consume() -> None:
+        try:
+            while (batch := q.get()) is not None:
+                for encoded in batch:
+                    write_fn(encoded)
+        except BaseException as e:
+            errors.append(e)
+            # Освобождаем очередь, чтобы производитель не завис на put()
+            while q.get() is not None:
+                pass
+
+    writer = threading.Thread(target=consume, name="writer", daemon=True)
+    writer.start()
+    batch = []
+    try:
+        for item in items:
+            encoded = encode_fn(item)
+            if encoded is None:
+                continue
+            batch.append(encoded)
+            if len(batch) >= _PIPELINE_BATCH:
+                if errors:
+                    break
+                q.put(batch)
+                batch = []
+    finally:
+        # Недобранную пачку отдаём и при ошибке разбора: всё уже разобранное должно попасть в файл
+        if batch and not errors:
+            q.put(batch)
+        q.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+
+
+def _read_with_progress(parser, progress_interval: int, label: str, counter: list[int]):
+    """
+    Отдаёт объекты parser как есть и каждые progress_interval штук печатает «label: N».
+    Число прочитанных объектов по окончании записывается в counter[0].
+    """
+    total_read = 0
+    # Обратный отсчёт до следующей строки прогресса вместо деления по модулю на каждом объекте;
+    # при выключенном прогрессе счётчик уходит в минус и нуля больше не достигает.
+    next_progress = progress_interval if progress_interval > 0 else -1
+    try:
+        for obj in parser:
+            total_read += 1
+            yield obj
+            next_progress -= 1
+            if not next_progress:
+                print(f"  {label}: {total_read:,}", flush=True)
+                next_progress = progress_interval
+    finally:
+        counter[0] = total_read
 
 
 def json_to_txt(
@@ -141,38 +372,32 @@ def json_to_txt(
         output_path = os.path.join(output_dir, f"{base}.txt")
 
     ijson_prefix = f"{array_path}.item" if array_path else "item"
-    total_read = 0
 
     if progress_interval > 0:
         print(f"  Конвертация в TXT: {os.path.basename(input_path)} → {os.path.basename(output_path)}", flush=True)
 
-    with open(input_path, "rb") as fin:
-        with open(output_path, "w", encoding="utf-8") as fout:
-            parser = ijson.items(fin, ijson_prefix)
-
-            for obj in parser:
-                total_read += 1
-
-                if format_ == "chat":
-                    # Формат для Telegram: 2023-12-27 10:28 | Автор: текст
-                    date = obj.get("date", "")
-                    if "T" in str(date):
-                        date = str(date).replace("T", " ")[:16]  # YYYY-MM-DD HH:MM
-                    author = obj.get("from") or obj.get("actor") or ""
-                    text = obj.get("text") or ""
-                    if not text and obj.get("text_entities"):
-                        text = " ".join(_extract_text(e) for e in obj["text_entities"])
-                    else:
-                        text = _extract_text(text)
-                    text = _normalize_text(text)
-                    line = f"{date} | {author}: {text}"
-                    fout.write(line.rstrip() + "\n")
-                else:
-                    # jsonl: один JSON-объект на строку
-                    fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
-
-                if progress_interval > 0 and total_read % progress_interval == 0:
-                    print(f"  Обработано: {total_read:,}", flush=True)
+    def encode_chat(obj: dict) -> bytes:
+        # Формат для Telegram: 2023-12-27 10:28 | Автор: текст
+        date = _fmt_date(obj.get("date", ""))
+        author = obj.get("from") or obj.get("actor") or ""
+        text = _normalize_text(_message_text(obj))
+        line = f"{date} | {author}: {text}"
+        return (line.rstrip() + "\n").encode("utf-8")
+
+    def encode_jsonl(obj) -> bytes:
+        # jsonl: один JSON-объект на строку
+        return _dumps_bytes(obj) + b"\n"
+
+    with open(input_path, "rb", buffering=IO_BUFFER_SIZE) as fin:
+        with open(output_path, "wb", buffering=IO_BUFFER_SIZE) as fout:
+            counter = [0]
+            if format_ == "chat":
+                parser = iter_filtered_items(fin, ijson_prefix)
+                _pipeline(_read_with_progress(parser, progress_interval, "Обработано", counter), encode_chat, fout.write)
+            else:
+                parser = ijson.items(fin, ijson_prefix)
+                _pipeline(_read_with_progress(parser, progress_interval, "Обработано", counter), encode_jsonl, fout.write)
+            total_read = counter[0]
 
     if progress_interval > 0:
         print(f"  Готово: {total_read:,} записей → {output_path}", flush=True)
@@ -180,6 +405,191 @@ def json_to_txt(
     return os.path.abspath(output_path)
 
 
+# Строка отчёта в первой MD-части: место резервируется пробелами при записи части,
+# а в конце поверх него пишется итог — без повторного чтения и перезаписи всего файла.
+_REPORT_WIDTH = 80
+_REPORT_PLACEHOLDER = b" " * _REPORT_WIDTH + b"\n\n"
+
+# Значение для незаданного лимита в циклах разбиения
+_NO_LIMIT = sys.maxsize
+
+
+def _split_md(
+    parser,
+    output_dir: str,
+    output_prefix: str,
+    max_size_bytes: int | None,
+    max_objects_per_file: int | None,
+    max_words_per_file: int | None,
+    progress_interval: int,
+    author_at_top: bool,
+    skip_empty_messages: bool,
+    compress: str = "none",
+) -> tuple[list[str], int]:
+    """
+    Цикл разбиения для MD. Возвращает (созданные файлы, число прочитанных объектов).
+    В начало первой части пишется строка отчёта с общим числом сообщений.
+    """
+    created_files: list[str] = []
+    ext = ".md" + COMPRESS_SUFFIXES[compress]
+    first_part: bytearray | None = None  # сжатая первая часть откладывается до отчёта
+
+    # Разделитель между блоками (короче чем \n---\n)
+    sep = b"\n\n"
+    sep_len = len(sep)
+
+    # Незаданный лимит — бесконечный: проверки в цикле становятся простыми сравнениями без ветвлений
+    size_limit = max_size_bytes or _NO_LIMIT
+    objects_limit = max_objects_per_file or _NO_LIMIT
+    words_limit = max_words_per_file or _NO_LIMIT
+
+    # Блоки сразу дописываются в буфер части (одна конвертация на объект)
+    current_buf = bytearray()  # готовый текст части в UTF-8 (Source и блоки через sep)
+    count = 0  # число блоков в буфере
+    current_words = 0  # число слов в текущей части (под лимит NotebookLM)
+    part_index = 1
+
+    def write_part() -> None:
+        nonlocal current_buf, count, current_words, part_index, first_part
+        if count == 0:
+            return
+        out_name = os.path.join(output_dir, f"{output_prefix}_{part_index}{ext}")
+        created_files.append(os.path.abspath(out_name))
+        if part_index == 1 and compress != "none":
+            # Сжатый поток нельзя дописать на месте: первая часть запишется в конце, уже с отчётом
+            first_part = current_buf
+        else:
+            if progress_interval > 0:
+                print(f"  Запись части {part_index}: {os.path.basename(out_name)} ({count:,} объектов)...", flush=True)
+            with _open_output(out_name, compress) as f:
+                if part_index == 1:
+                    f.write(_REPORT_PLACEHOLDER)
+                f.write(current_buf)
+            if progress_interval > 0:
+                size_mb = len(current_buf) / (1024 * 1024)
+                print(f"  Готово: {os.path.basename(out_name)} ({size_mb:.1f} МБ)", flush=True)
+        part_index += 1
+        current_buf = bytearray()
+        count = 0
+        current_words = 0
+
+    def encode(obj: dict) -> tuple[bytes, int, str] | None:
+        date, author, text = _md_fields(obj)
+        if skip_empty_messages and not text:
+            return None
+        # Слова считаются по полному блоку "### дата | автор\nтекст"; в нормализованном тексте
+        # слова разделены ровно одним пробелом, так что split() по всему блоку не нужен.
+        obj_words = 2 + len(f"{date} {author}".split()) + (text.count(" ") + 1 if text else 0)
+        # С author_at_top в блоке сразу только "### дата" — автор пишется один раз в начале части
+        header = f"### {date}" if author_at_top else f"### {date} | {author}"
+        # Вызывается на каждое сообщение: одна f-строка и один encode, без списка строк и join
+        obj_content = (f"{header}\n{text}" if text else header).encode("utf-8")
+        return obj_content, obj_words, author
+
+    def add_block(block: tuple[bytes, int, str]) -> None:
+        nonlocal current_buf, count, current_words
+        obj_content, obj_words, obj_author = block
+        # Сбросить часть, если следующий блок не влезет по размеру (жёсткий лимит), по количеству
+        # объектов или по словам (под NotebookLM ~500k)
+        if count and (
+            len(current_buf) + sep_len + len(obj_content) > size_limit
+            or count >= objects_limit
+            or current_words + obj_words > words_limit
+        ):
+            write_part()
+
+        if count:
+            current_buf += sep
+        elif author_at_top:
+            current_buf += f"Source: {obj_author}\n\n".encode("utf-8")
+        current_buf += obj_content
+        count += 1
+        current_words += obj_words
+
+    # Разбор и конвертация — в текущем потоке, накопление частей и запись файлов — в потоке записи
+    counter = [0]
+    _pipeline(_read_with_progress(parser, progress_interval, "Обработано объектов", counter), encode, add_block)
+    total_read = counter[0]
+    write_part()
+
+    # Отчёт: поверх зарезервированного места — без повторного чтения и перезаписи всего файла
+    if created_files:
+        # Строка отчёта дополняется пробелами до _REPORT_WIDTH и в сжатых частях — содержимое то же
+        report_line = f"### Отчёт | Всего сообщений: {total_read:,}".encode("utf-8").ljust(_REPORT_WIDTH)
+        if first_part is not None:
+            out_name = created_files[0]
+            if progress_interval > 0:
+                print(f"  Запись части 1: {os.path.basename(out_name)}...", flush=True)
+            with _open_output(out_name, compress) as f:
+                f.write(report_line + b"\n\n")
+                f.write(first_part)
+            if progress_interval > 0:
+                size_mb = len(first_part) / (1024 * 1024)
+                print(f"  Готово: {os.path.basename(out_name)} ({size_mb:.1f} МБ)", flush=True)
+        else:
+            with open(created_files[0], "r+b") as f:
+                f.write(report_line)
+    return created_files, total_read
+
+
+def _split_json(
+    parser,
+    output_dir: str,
+    output_prefix: str,
+    max_size_bytes: int | None,
+    max_objects_per_file: int | None,
+    progress_interval: int,
+    compress: str = "none",
+) -> tuple[list[str], int]:
+    """Цикл разбиения для JSON. Возвращает (созданные файлы, число прочитанных объектов)."""
+    created_files: list[str] = []
+    ext = ".json" + COMPRESS_SUFFIXES[compress]
+
+    size_limit = max_size_bytes or _NO_LIMIT
+    objects_limit = max_objects_per_file or _NO_LIMIT
+
+    current_objects: list[bytes] = []  # уже сериализованные объекты текущей части
+    count = 0
+    current_size = 0
+    part_index = 1
+
+    def write_part() -> None:
+        nonlocal current_objects, count, current_size, part_index
+        if count == 0:
+            return
+        out_name = os.path.join(output_dir, f"{output_prefix}_{part_index}{ext}")
+        if progress_interval > 0:
+            print(f"  Запись части {part_index}: {os.path.basename(out_name)} ({count:,} объектов)...", flush=True)
+        with _open_output(out_name, compress) as f:
+            f.write(b"[" + b",".join(current_objects) + b"]")
+        created_files.append(os.path.abspath(out_name))
+        if progress_interval > 0:
+            size_mb = current_size / (1024 * 1024)
+            print(f"  Готово: {os.path.basename(out_name)} ({size_mb:.1f} МБ)", flush=True)
+        part_index += 1
+        current_objects = []
+        count = 0
+        current_size = 0
+
+    def add_object(obj_json: bytes) -> None:
+        nonlocal count, current_size
+        obj_size = len(obj_json)
+        # Сбросить часть, если объект не влезет по размеру или по количеству объектов
+        if count and (current_size + obj_size > size_limit or count >= objects_limit):
+            write_part()
+
+        current_objects.append(obj_json)
+        count += 1
+        current_size += obj_size
+
+    # Сериализация — в текущем потоке, накопление частей и запись файлов — в потоке записи
+    counter = [0]
+    _pipeline(_read_with_progress(parser, progress_interval, "Обработано объектов", counter), _dumps_bytes, add_object)
+    total_read = counter[0]
+    write_part()
+    return created_files, total_read
+
+
 def split_json(
     input_path: str,
     output_dir: str = "dist",
@@ -192,6 +602,7 @@ def split_json(
     output_format: str = "md",
     author_at_top: bool = True,
     skip_empty_messages: bool = True,
+    compress: str = "none",
 ) -> list[str]:
     """
     Читает JSON-массив потоково и сохраняет части в output_dir (part_1.json или part_1.md).
@@ -201,7 +612,16 @@ def split_json(
         author_at_top: для MD — вынести автора один раз в начало, в блоках только ### дата и текст.
         skip_empty_messages: для MD — не писать блоки без текста.
         max_words_per_file: для MD — макс. слов в одном файле (NotebookLM ~500k, с запасом 450k).
+        compress: "none", "gzip" (part_1.md.gz) или "zstd" (part_1.md.zst, нужен zstandard).
+            Лимит размера считается по несжатым данным, так что границы частей не меняются.
+            Для MD первая сжатая часть держится в памяти до конца разбора (сжатый поток нельзя
+            дописать на месте) и записывается последней, уже со строкой отчёта — до max_size_mb
+            дополнительной памяти. Строка отчёта, как и без сжатия, дополнена пробелами до 80 байт.
     """
+    if compress not in COMPRESS_SUFFIXES:
+        raise ValueError(f"Неизвестное сжатие: {compress} (допустимо: {', '.join(COMPRESS_SUFFIXES)})")
+    if compress == "zstd" and zstandard is None:
+        raise ValueError("Для --compress zstd установите пакет zstandard (pip install zstandard)")
     os.makedirs(output_dir, exist_ok=True)
     has_limit = (
         max_file_size_mb is not None
@@ -213,58 +633,7 @@ def split_json(
             "Укажите хотя бы одно ограничение: max_file_size_mb, max_objects_per_file или max_words_per_file (для md)"
         )
 
-    ext = ".md" if output_format == "md" else ".json"
     max_size_bytes = int(max_file_size_mb * 1024 * 1024) if max_file_size_mb else None
-    created_files: list[str] = []
-
-    # MD: разделитель между блоками (короче чем \n---\n)
-    sep = "\n\n"
-    sep_len = len(sep.encode("utf-8"))
-
-    # MD: накапливаем готовые строки (одна конвертация на объект). JSON: накапливаем объекты.
-    current_objects: list = []  # для json — список dict; для md не используется
-    current_md_blocks: list[str] = []  # для md — готовые блоки, без повторной конвертации
-    current_size = 0
-    current_words = 0  # для md — число слов в текущей части (под лимит NotebookLM)
-    part_index = 1
-
-    total_read = 0
-
-    def write_part() -> None:
-        nonlocal current_objects, current_size, part_index, current_md_blocks, current_words
-        n = len(current_md_blocks) if output_format == "md" else len(current_objects)
-        if n == 0:
-            return
-        out_name = os.path.join(output_dir, f"{output_prefix}_{part_index}{ext}")
-        if progress_interval > 0:
-            print(f"  Запись части {part_index}: {os.path.basename(out_name)} ({n:,} объектов)...", flush=True)
-        with open(out_name, "w", encoding="utf-8") as f:
-            if output_format == "md":
-                if author_at_top and current_md_blocks:
-                    first_block = current_md_blocks[0]
-                    first_line = first_block.split("\n", 1)[0]
-                    author = first_line.split(" | ", 1)[1] if " | " in first_line else ""
-                    f.write(f"Source: {author}\n\n")
-                    transformed = []
-                    for block in current_md_blocks:
-                        first_ln = block.split("\n", 1)[0]
-                        date_only = first_ln.split(" | ", 1)[0]  # "### 2025-01-01 01:34"
-                        rest = block.split("\n", 1)[1] if "\n" in block else ""
-                        transformed.append(date_only + ("\n" + rest if rest else ""))
-                    f.write(sep.join(transformed))
-                else:
-                    f.write(sep.join(current_md_blocks))
-            else:
-                json.dump(current_objects, f, ensure_ascii=False, separators=(",", ":"))
-        created_files.append(os.path.abspath(out_name))
-        if progress_interval > 0:
-            size_mb = current_size / (1024 * 1024)
-            print(f"  Готово: {os.path.basename(out_name)} ({size_mb:.1f} МБ)", flush=True)
-        part_index += 1
-        current_objects = []
-        current_md_blocks = []
-        current_size = 0
-        current_words = 0
 
     # Путь к элементам массива для ijson: "item" для корня, "messages.item" для obj["messages"]
     ijson_prefix = f"{array_path}.item" if array_path else "item"
@@ -272,67 +641,32 @@ def split_json(
     if progress_interval > 0:
         print(f"  Чтение и разбиение: {os.path.basename(input_path)}", flush=True)
 
-    with open(input_path, "rb") as f:
-        # Потоковый парсинг массива: объекты приходят по одному
-        parser = ijson.items(f, ijson_prefix)
-
-        for obj in parser:
-            if output_format == "md":
-                obj_content = obj_to_md(obj)
-                if skip_empty_messages and "\n" not in obj_content.strip():
-                    total_read += 1
-                    if progress_interval > 0 and total_read % progress_interval == 0:
-                        print(f"  Обработано объектов: {total_read:,}", flush=True)
-                    continue
-                obj_size = len(obj_content.encode("utf-8")) + (sep_len if current_md_blocks else 0)
-                obj_words = len(obj_content.split())
-            else:
-                obj_json = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
-                obj_size = len(obj_json.encode("utf-8"))
-
-            # Сначала сбросить часть, если уже набрали лимит по размеру (жёсткий лимит)
-            if max_size_bytes and current_size >= max_size_bytes:
-                write_part()
-            # Перед добавлением следующего объекта — сбросить, если он не влезет
-            n_current = len(current_md_blocks) if output_format == "md" else len(current_objects)
-            if max_size_bytes and n_current and (current_size + obj_size > max_size_bytes):
-                write_part()
-            # Лимит по количеству объектов
-            n_current = len(current_md_blocks) if output_format == "md" else len(current_objects)
-            if max_objects_per_file and n_current >= max_objects_per_file:
-                write_part()
-            # Лимит по словам (для MD, под NotebookLM ~500k)
-            if (
-                output_format == "md"
-                and max_words_per_file
-                and current_md_blocks
-                and (current_words + obj_words > max_words_per_file)
-            ):
-                write_part()
-
-            if output_format == "md":
-                current_md_blocks.append(obj_content)
-                current_words += obj_words
-            else:
-                current_objects.append(obj)
-            current_size += obj_size
-            total_read += 1
-
-            if progress_interval > 0 and total_read % progress_interval == 0:
-                print(f"  Обработано объектов: {total_read:,}", flush=True)
-
-    if current_objects or current_md_blocks:
-        write_part()
-
-    # В первый файл добавляем краткий отчёт с общим количеством сообщений.
-    if output_format == "md" and created_files:
-        first_path = created_files[0]
-        tmp_path = first_path + ".tmp"
-        report_line = f"### Отчёт | Всего сообщений: {total_read:,}"
-        with open(first_path, "r", encoding="utf-8") as fin, open(tmp_path, "w", encoding="utf-8") as fout:
-            fout.write(report_line + "\n\n")
-            fout.write(fin.read())
-        os.replace(tmp_path, first_path)
+    with open(input_path, "rb", buffering=IO_BUFFER_SIZE) as f:
+        # Потоковый парсинг массива: объекты приходят по одному. Формат выбирается один раз,
+        # дальше работает свой цикл без проверок output_format на каждом объекте.
+        if output_format == "md":
+            created_files, total_read = _split_md(
+                iter_filtered_items(f, ijson_prefix),
+                output_dir,
+                output_prefix,
+                max_size_bytes,
+                max_objects_per_file,
+                max_words_per_file,
+                progress_interval,
+                author_at_top,
+                skip_empty_messages,
+                compress,
+            )
+        else:
+            created_files, total_read = _split_json(
+                ijson.items(f, ijson_prefix),
+                output_dir,
+                output_prefix,
+                max_size_bytes,
+                max_objects_per_file,
+                progress_interval,
+                compress,
+            )
 
     if progress_interval > 0:
         print(f"  Всего обработано: {total_read:,} объектов, частей: {len(created_files)}", flush=True)
@@ -340,6 +674,49 @@ def split_json(
     return created_files
 
 
+def _run_tasks(func, tasks: list[dict], jobs: int):
+    """
+    Выполняет func(**kwargs) для каждого набора аргументов (по одному на входной файл).
+
+    При jobs > 1 файлы обрабатываются параллельно в пуле процессов (разбор JSON упирается в CPU,
+    потоки не помогли бы из-за GIL). Отдаёт (номер задачи, результат, ошибка) по мере готовности.
+    """
+    if jobs <= 1:
+        for i, kwargs in enumerate(tasks):
+            try:
+                yield i, func(**kwargs), None
+            except Exception as e:
+                yield i, None, e
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        futures = {ex.submit(func, **kwargs): i for i, kwargs in enumerate(tasks)}
+        try:
+            for fut in as_completed(futures):
+                try:
+                    yield futures[fut], fut.result(), None
+                except Exception as e:
+                    yield futures[fut], None, e
+        finally:
+            # При выходе по ошибке не запускаем оставшиеся файлы
+            for fut in futures:
+                fut.cancel()
+
+
+def _resolve_jobs(jobs: int | None, n_files: int) -> int:
+    """
+    Число процессов: по умолчанию 1 (с построчным прогрессом), 0 — по файлу на ядро.
+    Больше процессов, чем файлов, не запускаем.
+    """
+    if jobs is None:
+        return 1
+    if jobs < 0:
+        print("Ошибка: --jobs не может быть отрицательным", file=sys.stderr)
+        sys.exit(1)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    return max(1, min(n_files, jobs))
+
+
 def main() -> None:
     config = load_config()
 
@@ -466,11 +843,11 @@ def main() -> None:
                 print(f"Папка не найдена: {name}/", flush=True)
                 continue
             removed = 0
-            for f in os.listdir(folder):
-                path = os.path.join(folder, f)
-                if os.path.isfile(path):
-                    os.remove(path)
-                    removed += 1
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        os.remove(entry.path)
+                        removed += 1
             print(f"Очищено {name}/: удалено файлов {removed}", flush=True)
         return
 
@@ -511,6 +888,14 @@ def main() -> None:
             default="chat",
             help="chat — дата | автор: текст (Telegram); jsonl — по объекту на строку (по умолчанию: chat)",
         )
+        parser_txt.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            default=None,
+            metavar="N",
+            help="Сколько файлов обрабатывать параллельно; 0 — по числу ядер. По умолчанию: 1 (при N > 1 печатаются только итоги по файлам)",
+        )
         args_txt = parser_txt.parse_args(sys.argv[2:])
 
         array_path = args_txt.array_path if args_txt.array_path is not None else (config.get("array_path") or "")
@@ -527,32 +912,40 @@ def main() -> None:
             if not os.path.isdir(src_dir):
                 print(f"Ошибка: папка не найдена: {src_dir}", file=sys.stderr)
                 sys.exit(1)
-            input_files = sorted(
-                os.path.join(src_dir, f)
-                for f in os.listdir(src_dir)
-                if f.endswith(".json") and os.path.isfile(os.path.join(src_dir, f))
-            )
+            # scandir: тип файла приходит вместе со списком каталога, без отдельного stat на запись
+            with os.scandir(src_dir) as entries:
+                input_files = sorted(e.path for e in entries if e.name.endswith(".json") and e.is_file())
             if not input_files:
                 print("В папке src нет .json файлов", file=sys.stderr)
                 sys.exit(1)
 
-        created = []
+        jobs = _resolve_jobs(args_txt.jobs, len(input_files))
+        tasks = []
         for inp in input_files:
             out = args_txt.output
             if out and len(input_files) > 1:
                 out = None  # при нескольких входах — игнорируем общий --output
-            try:
-                path = json_to_txt(
+            tasks.append(
+                dict(
                     input_path=inp,
                     output_path=out,
                     output_dir=output_dir,
                     array_path=array_path,
                     format_=args_txt.format,
+                    # При параллельной работе прогресс процессов перемешался бы — печатаем только итоги
+                    progress_interval=50_000 if jobs == 1 else 0,
                 )
-                created.append(path)
-            except Exception as e:
-                print(f"Ошибка при конвертации {inp}: {e}", file=sys.stderr)
+            )
+
+        results: list[str | None] = [None] * len(tasks)
+        for i, path, error in _run_tasks(json_to_txt, tasks, jobs):
+            if error is not None:
+                print(f"Ошибка при конвертации {input_files[i]}: {error}", file=sys.stderr)
                 sys.exit(1)
+            if jobs > 1:
+                print(f"  Готово: {input_files[i]} → {path}", flush=True)
+            results[i] = path
+        created = [p for p in results if p is not None]
 
         print(f"Создано TXT: {len(created)}")
         for p in created:
@@ -616,6 +1009,20 @@ def main() -> None:
         default=None,
         help="Выходной формат: md (Markdown) или json (по умолчанию из конфига)",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Сколько файлов обрабатывать параллельно; 0 — по числу ядер. По умолчанию: 1 (при N > 1 печатаются только итоги по файлам)",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=list(COMPRESS_SUFFIXES),
+        default="none",
+        help="Сжимать выходные части: gzip (.gz) или zstd (.zst, нужен zstandard); по умолчанию: none",
+    )
     args = parser.parse_args()
 
     # Подставляем значения из config, если параметр не задан в консоли
@@ -652,11 +1059,8 @@ def main() -> None:
         if not os.path.isdir(src_dir):
             print(f"Ошибка: папка не найдена: {src_dir}", file=sys.stderr)
             sys.exit(1)
-        input_files = sorted(
-            os.path.join(src_dir, f)
-            for f in os.listdir(src_dir)
-            if f.endswith(".json") and os.path.isfile(os.path.join(src_dir, f))
-        )
+        with os.scandir(src_dir) as entries:
+            input_files = sorted(e.path for e in entries if e.name.endswith(".json") and e.is_file())
         if not input_files:
             print("В папке src нет .json файлов", file=sys.stderr)
             sys.exit(1)
@@ -672,12 +1076,16 @@ def main() -> None:
         print("Ошибка: --max-words должно быть положительным", file=sys.stderr)
         sys.exit(1)
 
-    all_created: list[str] = []
+    jobs = _resolve_jobs(args.jobs, len(input_files))
+    if args.prefix is not None:
+        jobs = 1  # общий --prefix: все входы пишут в одни и те же имена частей, параллельно нельзя
+
+    tasks = []
     for input_path in input_files:
         # Префикс = имя файла без расширения (src/foo.json → foo → dist/foo_1.json, foo_2.json)
         prefix = args.prefix if args.prefix is not None else os.path.splitext(os.path.basename(input_path))[0]
-        try:
-            files = split_json(
+        tasks.append(
+            dict(
                 input_path=input_path,
                 output_dir=args.output_dir,
                 output_prefix=prefix,
@@ -685,16 +1093,24 @@ def main() -> None:
                 max_objects_per_file=args.max_objects,
                 max_words_per_file=args.max_words,
                 array_path=args.array_path,
+                # При параллельной работе прогресс процессов перемешался бы — печатаем только итоги
+                progress_interval=50_000 if jobs == 1 else 0,
                 output_format=args.format,
                 author_at_top=config.get("author_at_top", True),
                 skip_empty_messages=config.get("skip_empty_messages", True),
+                compress=args.compress,
             )
-            ext = ".md" if args.format == "md" else ".json"
-            print(f"{input_path} → {len(files)} файл(ов) {prefix}_*{ext}")
-            all_created.extend(files)
-        except Exception as e:
-            print(f"Ошибка при обработке {input_path}: {e}", file=sys.stderr)
+        )
+
+    ext = (".md" if args.format == "md" else ".json") + COMPRESS_SUFFIXES[args.compress]
+    results: list[list[str]] = [[] for _ in tasks]
+    for i, files, error in _run_tasks(split_json, tasks, jobs):
+        if error is not None:
+            print(f"Ошибка при обработке {input_files[i]}: {error}", file=sys.stderr)
             sys.exit(1)
+        print(f"{input_files[i]} → {len(files)} файл(ов) {tasks[i]['output_prefix']}_*{ext}", flush=True)
+        results[i] = files
+    all_created = [p for files in results for p in files]
 
     print(f"Всего создано файлов: {len(all_created)}")
     for p in all_created: